@@ -6,9 +6,10 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .const import CONF_UID, DOMAIN, OPTIONS_CONFIG
+from .const import CONF_UID, DOMAIN, OPTIONS_CONFIG, OPTIONS_PERSISTENT_SESSION
 from .mqtt import BemfaMqtt
 from .service import BemfaService
+from .storage import BemfaStorage
 
 from . import (
     sync_binary_sensor,
@@ -27,18 +28,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up bemfa from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    service = BemfaService(hass, entry.data[CONF_UID])
+    persistent_session = entry.options.get(OPTIONS_PERSISTENT_SESSION, False)
+    service = BemfaService(
+        hass, entry.entry_id, entry.data[CONF_UID], persistent_session
+    )
     await service.async_start(
         entry.options[OPTIONS_CONFIG] if OPTIONS_CONFIG in entry.options else {}
     )
 
     hass.data[DOMAIN][entry.entry_id] = {
         "service": service,
+        OPTIONS_PERSISTENT_SESSION: persistent_session,
     }
 
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Syncs are applied by options flow on the fly, reload for settings only."""
+    if hass.data[DOMAIN][entry.entry_id][
+        OPTIONS_PERSISTENT_SESSION
+    ] != entry.options.get(OPTIONS_PERSISTENT_SESSION, False):
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     data = hass.data[DOMAIN].get(entry.entry_id)
@@ -47,3 +62,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove data stored for a config entry."""
+    await BemfaStorage(hass, entry.entry_id).async_remove()
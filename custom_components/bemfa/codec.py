@@ -0,0 +1,128 @@
+"""Support for bemfa service."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import State
+
+from .const import MSG_OFF, MSG_SEPARATOR
+
+if TYPE_CHECKING:
+    from .sync import ControllableSync
+
+_LOGGING = logging.getLogger(__name__)
+
+# (domain, service, data)
+ServiceCall = tuple[str, str, dict[str, Any]]
+
+# encode a part of msg from hass state and attributes
+MsgEncoder = Callable[["ControllableSync", str, Mapping[str, Any]], "str | int"]
+
+# decode parts [start, end) of msg to a service call, None if nothing to call
+MsgDecoder = tuple[
+    int,
+    int,
+    Callable[
+        ["ControllableSync", "list[str | int]", Mapping[str, Any]],
+        "ServiceCall | None",
+    ],
+]
+
+
+class MsgCodec:
+    """Encoder / decoder tables of a sync type, built once per class."""
+
+    def __init__(
+        self, encoders: Sequence[MsgEncoder], decoders: Sequence[MsgDecoder]
+    ) -> None:
+        """Initialize."""
+        self._first_encoder = encoders[0]
+        self._other_encoders = tuple(encoders[1:])
+        self._decoders = tuple(decoders)
+
+    def encode(self, sync: ControllableSync, state: State) -> tuple[str, ...]:
+        """Encode hass state to msg parts."""
+        first = str(self._first_encoder(sync, state.state, state.attributes))
+
+        # if first one is off, the following parts is useless
+        if first == MSG_OFF:
+            return (first,)
+        return (first,) + tuple(
+            str(encoder(sync, state.state, state.attributes))
+            for encoder in self._other_encoders
+        )
+
+    @staticmethod
+    def decode(msg: str) -> tuple[str, ...]:
+        """Decode msg received from bemfa service to parts."""
+        parts = msg.split(MSG_SEPARATOR)
+        if parts[0] == MSG_OFF:
+            return (MSG_OFF,)  # discard any data followed by "off"
+        return tuple(parts)
+
+    @staticmethod
+    def join(parts: Sequence[str]) -> str:
+        """Join msg parts to send to bemfa service, without useless tail parts."""
+        end = len(parts)
+        while end > 0 and parts[end - 1] == "":
+            end -= 1
+        return MSG_SEPARATOR.join(parts[:end])
+
+    def resolve(
+        self,
+        sync: ControllableSync,
+        parts: tuple[str, ...],
+        state_parts: tuple[str, ...],
+        attributes: Mapping[str, Any],
+        all_fields: bool,
+    ) -> list[ServiceCall]:
+        """Service calls to make hass state match msg parts.
+        Unless all_fields, resolve the first field differs only.
+        """
+        calls: list[ServiceCall] = []
+        for (start_index, end_index, decoder) in self._decoders:
+            if all_fields:
+                end_index = min(end_index, len(parts))
+                if start_index >= end_index:
+                    continue
+            else:
+                end_index = min(end_index, len(parts), len(state_parts))
+            if parts[start_index:end_index] == state_parts[start_index:end_index]:
+                continue
+
+            fields: list[str | int] = [
+                int(part) if part.isdigit() else part
+                for part in parts[start_index:end_index]
+            ]
+            if not all_fields:
+                call = decoder(sync, fields, attributes)
+                return [call] if call is not None else []
+
+            # empty state parts, the attributes are not supported by the entity
+            field_state_parts = state_parts[start_index:end_index]
+            if len(field_state_parts) == end_index - start_index and not any(
+                field_state_parts
+            ):
+                continue
+
+            try:
+                call = decoder(sync, fields, attributes)
+            except (KeyError, IndexError, ValueError):
+                _LOGGING.warning(
+                    "Can not resolve %s of msg for %s", fields, sync.entity_id
+                )
+                continue
+            if call is None:
+                continue
+            (domain, service, data) = call
+
+            # merge data of the same service
+            for call in calls:
+                if call[0] == domain and call[1] == service:
+                    call[2].update(data)
+                    break
+            else:
+                calls.append((domain, service, data))
+        return calls
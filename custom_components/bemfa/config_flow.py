@@ -1,10 +1,12 @@
 """Config flow for bemfa integration."""
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
 import re
 from typing import Any
+import aiohttp
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -17,11 +19,13 @@ from homeassistant.helpers.selector import (
     SelectSelectorMode,
 )
 
+from .http import BemfaApiError
 from .sync import Sync
 from .const import (
     CONF_UID,
     DOMAIN,
     OPTIONS_CONFIG,
+    OPTIONS_PERSISTENT_SESSION,
     OPTIONS_SELECT,
 )
 from .service import BemfaService
@@ -95,6 +99,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialize options flow."""
         self._entry_id = config_entry.entry_id
+        self._options = dict(config_entry.options)
         self._config = (
             config_entry.options[OPTIONS_CONFIG].copy()
             if OPTIONS_CONFIG in config_entry.options
@@ -111,6 +116,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 "create_sync",
                 "modify_sync",
                 "destroy_sync",
+                "settings",
             ],
         )
 
@@ -166,12 +172,9 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         service = self._get_service()
         all_topics = await service.async_fetch_all_topics()
-        all_syncs = service.collect_supported_syncs()
-        self._sync_dict = {}
-        for sync in all_syncs:
-            if sync.topic in all_topics:
-                sync.name = all_topics[sync.topic]
-                self._sync_dict[sync.entity_id] = sync
+        self._sync_dict = {
+            sync.entity_id: sync for sync in service.collect_synced_syncs(all_topics)
+        }
 
         if not bool(self._sync_dict):
             return self.async_show_form(step_id="empty", last_step=False)
@@ -199,14 +202,17 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             last_step=False,
         )
 
-    async def _async_step_sync_config(self) -> FlowResult:
+    async def _async_step_sync_config(
+        self, errors: dict[str, str] | None = None
+    ) -> FlowResult:
         """Set details of a hass-to-bemfa sync."""
-        if self._sync.topic in self._config:
+        if errors is None and self._sync.topic in self._config:
             self._sync.config = self._config[self._sync.topic]
 
         return self.async_show_form(
             step_id=self._sync.get_config_step_id(),
             data_schema=vol.Schema(self._sync.generate_details_schema()),
+            errors=errors,
         )
 
     async def async_step_sync_config_sensor(
@@ -255,17 +261,22 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         service = self._get_service()
-        if self._is_create:
-            await service.async_create_sync(self._sync, user_input)
-        else:
-            await service.async_modify_sync(self._sync, user_input)
+        try:
+            if self._is_create:
+                await service.async_create_sync(self._sync, user_input)
+            else:
+                await service.async_modify_sync(self._sync, user_input)
+        except (BemfaApiError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+            # keep what the user has input and let them try again
+            _LOGGER.warning("Failed to save sync %s: %s", self._sync.topic, err)
+            return await self._async_step_sync_config({"base": "cannot_connect"})
 
         # store config to integration options
         if self._sync.config:
             self._config[self._sync.topic] = self._sync.config
         elif self._sync.topic in self._config:
             self._config.pop(self._sync.topic)
-        return self.async_create_entry(title="", data={OPTIONS_CONFIG: self._config})
+        return self._async_create_entry()
 
     async def async_step_destroy_sync(
         self, user_input: dict[str, Any] | None = None
@@ -273,22 +284,18 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Destroy hass-to-bemfa sync(s)"""
         service = self._get_service()
         if user_input is not None:
-            for topic in user_input[OPTIONS_SELECT]:
-                await service.async_destroy_sync(topic)
-                if topic in self._config:
+            results = await service.async_destroy_syncs(user_input[OPTIONS_SELECT])
+            for (topic, err) in results.items():
+                # keep config of topics failed to destroy
+                if err is None and topic in self._config:
                     self._config.pop(topic)
-            return self.async_create_entry(
-                title="", data={OPTIONS_CONFIG: self._config}
-            )
+            return self._async_create_entry()
 
         all_topics = await service.async_fetch_all_topics()
-        all_syncs = service.collect_supported_syncs()
         topic_map: dict[str, str] = {}
-        for sync in all_syncs:
-            if sync.topic in all_topics:
-                sync.name = all_topics[sync.topic]
-                all_topics.pop(sync.topic)
-                topic_map[sync.topic] = sync.generate_option_label()
+        for sync in service.collect_synced_syncs(all_topics):
+            all_topics.pop(sync.topic)
+            topic_map[sync.topic] = sync.generate_option_label()
 
         for (topic, name) in all_topics.items():
             topic_map[topic] = "[?] {name}".format(name=name)
@@ -316,11 +323,38 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             ),
         )
 
+    async def async_step_settings(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Settings of this integration."""
+        if user_input is not None:
+            self._options.update(user_input)
+            return self._async_create_entry()
+
+        return self.async_show_form(
+            step_id="settings",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        OPTIONS_PERSISTENT_SESSION,
+                        default=self._options.get(OPTIONS_PERSISTENT_SESSION, False),
+                    ): bool
+                }
+            ),
+        )
+
     async def async_step_empty(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """No syncs found."""
         return await self.async_step_init(user_input)
 
+    @callback
+    def _async_create_entry(self) -> FlowResult:
+        """Save syncs config, keep other options."""
+        return self.async_create_entry(
+            title="", data={**self._options, OPTIONS_CONFIG: self._config}
+        )
+
     def _get_service(self) -> BemfaService:
         return self.hass.data[DOMAIN].get(self._entry_id)["service"]
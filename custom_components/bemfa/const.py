@@ -10,6 +10,7 @@ DOMAIN: Final = "bemfa"
 CONF_UID: Final = "uid"
 
 OPTIONS_CONFIG: Final = "config"
+OPTIONS_PERSISTENT_SESSION: Final = "persistent_session"
 OPTIONS_SELECT: Final = "select"
 
 OPTIONS_NAME: Final = "name"
@@ -20,6 +21,14 @@ OPTIONS_ILLUMINANCE: Final = "illuminance"
 OPTIONS_PM25: Final = "pm25"
 OPTIONS_CO2: Final = "co2"
 
+OPTIONS_TEMPERATURE_DEADBAND: Final = "temperature_deadband"
+OPTIONS_HUMIDITY_DEADBAND: Final = "humidity_deadband"
+OPTIONS_ILLUMINANCE_DEADBAND: Final = "illuminance_deadband"
+OPTIONS_PM25_DEADBAND: Final = "pm25_deadband"
+OPTIONS_CO2_DEADBAND: Final = "co2_deadband"
+OPTIONS_MIN_INTERVAL: Final = "min_interval"
+OPTIONS_MAX_INTERVAL: Final = "max_interval"
+
 OPTIONS_FAN_SPEED_0_VALUE: Final = "fan_speed_0_value"
 OPTIONS_FAN_SPEED_1_VALUE: Final = "fan_speed_1_value"
 OPTIONS_FAN_SPEED_2_VALUE: Final = "fan_speed_2_value"
@@ -47,12 +56,35 @@ class TopicSuffix(StrEnum):
 MQTT_HOST: Final = "bemfa.com"
 MQTT_PORT: Final = 9501
 MQTT_KEEPALIVE: Final = 600
+MQTT_RECONNECT_MIN_DELAY: Final = 1  # wait 1s before 2nd connecting attempt
+MQTT_RECONNECT_MAX_DELAY: Final = 300  # double the delay on each failure, up to 5min
+MQTT_RECONNECT_RESET_TIME: Final = 60  # start backoff over once connected for 60s
+MQTT_SUBSCRIBE_CHUNK: Final = 50  # subscribe 50 topics in one packet at most
+INITIAL_SYNC_CHUNK: Final = 50  # create 50 syncs in one loop iteration on startup
+INITIAL_PUBLISH_WINDOW: Final = 10  # spread first publishes over 10s
 TOPIC_PUBLISH: Final = "{topic}/set"
 TOPIC_PREFIX: Final = "hass"
 TOPIC_PING: Final = f"{TOPIC_PREFIX}ping"
+TOPIC_CACHE_SIZE: Final = 4096  # topics of 4096 entities cached at most
 INTERVAL_PING_SEND = 30  # send ping msg every 30s
 INTERVAL_PING_RECEIVE = 20  # detect a ping lost in 20s after a ping message send
 MAX_PING_LOST = 3  # reconnect to mqtt server when 3 continous ping losts detected
+# coalesce state changes of a topic within this window (seconds) and publish the latest only
+PUBLISH_WINDOW: Final = {
+    TopicSuffix.LIGHT: 0.5,
+    TopicSuffix.FAN: 0.5,
+    TopicSuffix.COVER: 1,
+    TopicSuffix.SENSOR: 1,
+}
+PUBLISH_MAX_DELAY: Final = 2  # publish coalesced state changes in 2s at most
+PUBLISH_BUCKET_SIZE: Final = 10  # publish 10 msgs in a burst at most
+PUBLISH_RATE: Final = 5  # then 5 msgs per second
+PRIORITY_WINDOW: Final = 5  # publish topics commanded in last 5s ahead of others
+INBOUND_QUEUE_SIZE: Final = 100  # drop oldest msgs received if hass is too busy
+COMMAND_SETTLE_TIME: Final = 1  # publish state unchanged for 1s after a command
+COMMAND_SETTLE_MAX_DELAY: Final = 5  # or 5s after the command at most
+ECHO_LOOP_WINDOW: Final = 60  # bemfa and hass are in a loop if we had to correct
+ECHO_LOOP_MAX: Final = 3  # commands of a topic 3 times in 60s
 MSG_SEPARATOR: Final = "#"
 MSG_ON: Final = "on"
 MSG_OFF: Final = "off"
@@ -65,3 +97,10 @@ FETCH_TOPICS_URL: Final = "https://api.bemfa.com/api/device/v1/topic/?uid={uid}&
 CREATE_TOPIC_URL: Final = f"{HTTP_BASE_URL}user/addtopic/"
 RENAME_TOPIC_URL: Final = f"{HTTP_BASE_URL}device/v1/topic/name/"
 DEL_TOPIC_URL: Final = f"{HTTP_BASE_URL}user/deltopic/"
+TOPICS_CACHE_TTL: Final = 300  # fetch topics again if cached ones are older than 5min
+HTTP_CONCURRENCY: Final = 5  # 5 requests in flight at most for bulk topic operations
+
+# #### Storage ####
+STORAGE_VERSION: Final = 1
+STORAGE_KEY: Final = f"{DOMAIN}.{{entry_id}}"
+STORAGE_SAVE_DELAY: Final = 10
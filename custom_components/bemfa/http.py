@@ -1,22 +1,33 @@
 """Bemfa http apis."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Awaitable, Callable
 import logging
+from typing import Any
 
+import aiohttp
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .const import (
     CREATE_TOPIC_URL,
     DEL_TOPIC_URL,
     FETCH_TOPICS_URL,
+    HTTP_CONCURRENCY,
     RENAME_TOPIC_URL,
     TOPIC_PREFIX,
+    TOPICS_CACHE_TTL,
 )
 
 _LOGGING = logging.getLogger(__name__)
 
 
+class BemfaApiError(HomeAssistantError):
+    """Bemfa service refused a request."""
+
+
 class BemfaHttp:
     """Send http requests to bemfa service."""
 
@@ -25,28 +36,40 @@ class BemfaHttp:
         self._hass = hass
         self._uid = uid
 
-    async def async_fetch_all_topics(self) -> dict[str, str]:
-        """Fetch all topics created by us from bemfa service."""
-        session = async_get_clientsession(self._hass)
-        async with session.get(
-            FETCH_TOPICS_URL.format(uid=self._uid),
-        ) as res:
-            res.raise_for_status()
-            res_dict = await res.json(content_type="text/html", encoding="utf-8")
-            if res_dict["code"] == 111 and res_dict["status"] == "get ok":
-                return {
+        # topic -> name, kept up to date by our own changes, None if not fetched yet
+        self._topics: dict[str, str] | None = None
+        self._topics_fetched_at: float = 0
+
+    async def async_fetch_all_topics(self, refresh: bool = False) -> dict[str, str]:
+        """Fetch all topics created by us from bemfa service.
+        Cached ones are returned unless refresh or expired.
+        """
+        if (
+            refresh
+            or self._topics is None
+            or self._hass.loop.time() - self._topics_fetched_at > TOPICS_CACHE_TTL
+        ):
+            session = async_get_clientsession(self._hass)
+            async with session.get(
+                FETCH_TOPICS_URL.format(uid=self._uid),
+            ) as res:
+                res.raise_for_status()
+                res_dict = await res.json(content_type="text/html", encoding="utf-8")
+                if res_dict["code"] != 111 or res_dict["status"] != "get ok":
+                    return {}
+                self._topics = {
                     topic["topic_id"]: topic["v_name"]
                     for topic in res_dict["data"]
                     if topic["topic_id"].startswith(TOPIC_PREFIX)
                 }
-            return {}
+                self._topics_fetched_at = self._hass.loop.time()
+        return self._topics.copy()
 
     async def async_create_topic(self, topic: str, name: str) -> None:
         """Create a topic to bemfa service."""
         if not topic.startswith(TOPIC_PREFIX):
             return
-        session = async_get_clientsession(self._hass)
-        await session.post(
+        await self._async_post(
             CREATE_TOPIC_URL,
             data={
                 "uid": self._uid,
@@ -55,13 +78,14 @@ class BemfaHttp:
                 "name": name,
             },
         )
+        if self._topics is not None:
+            self._topics[topic] = name
 
     async def async_rename_topic(self, topic: str, name: str) -> None:
         """Rename a topic in bemfa service."""
         if not topic.startswith(TOPIC_PREFIX):
             return
-        session = async_get_clientsession(self._hass)
-        await session.post(
+        await self._async_post(
             RENAME_TOPIC_URL,
             data={
                 "uid": self._uid,
@@ -70,13 +94,14 @@ class BemfaHttp:
                 "name": name,
             },
         )
+        if self._topics is not None:
+            self._topics[topic] = name
 
     async def async_del_topic(self, topic: str) -> None:
         """Delete a topic from bemfa service."""
         if not topic.startswith(TOPIC_PREFIX):
             return
-        session = async_get_clientsession(self._hass)
-        await session.post(
+        await self._async_post(
             DEL_TOPIC_URL,
             data={
                 "uid": self._uid,
@@ -84,3 +109,70 @@ class BemfaHttp:
                 "type": 1,
             },
         )
+        if self._topics is not None:
+            self._topics.pop(topic, None)
+
+    async def _async_post(self, url: str, data: dict[str, Any]) -> None:
+        """Post to bemfa service, raise if it did not succeed."""
+        session = async_get_clientsession(self._hass)
+        async with session.post(url, data=data) as res:
+            res.raise_for_status()
+            try:
+                res_dict = await res.json(content_type=None, encoding="utf-8")
+            except ValueError as err:
+                raise BemfaApiError("Invalid response") from err
+            if res_dict.get("code") != 0:
+                raise BemfaApiError(
+                    "{code}: {message}".format(
+                        code=res_dict.get("code"), message=res_dict.get("message")
+                    )
+                )
+
+    async def async_create_topics(
+        self, topics: dict[str, str], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Create topics (topic -> name) to bemfa service.
+        Return error of each topic, None if succeeded.
+        """
+        return await _async_bulk(
+            lambda topic: self.async_create_topic(topic, topics[topic]),
+            list(topics),
+            concurrency,
+        )
+
+    async def async_rename_topics(
+        self, topics: dict[str, str], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Rename topics (topic -> name) in bemfa service.
+        Return error of each topic, None if succeeded.
+        """
+        return await _async_bulk(
+            lambda topic: self.async_rename_topic(topic, topics[topic]),
+            list(topics),
+            concurrency,
+        )
+
+    async def async_del_topics(
+        self, topics: list[str], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Delete topics from bemfa service.
+        Return error of each topic, None if succeeded.
+        """
+        return await _async_bulk(self.async_del_topic, topics, concurrency)
+
+
+async def _async_bulk(
+    func: Callable[[str], Awaitable[None]], topics: list[str], concurrency: int
+) -> dict[str, Exception | None]:
+    """Call func on each topic with limited requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _call(topic: str) -> Exception | None:
+        async with semaphore:
+            try:
+                await func(topic)
+            except (aiohttp.ClientError, asyncio.TimeoutError, BemfaApiError) as err:
+                return err
+            return None
+
+    return dict(zip(topics, await asyncio.gather(*(_call(topic) for topic in topics))))
@@ -3,27 +3,44 @@ from __future__ import annotations
 import asyncio
 
 import logging
+import random
+from collections import deque
+from collections.abc import Callable
 from typing import Any
 
 import paho.mqtt.client as mqtt
 
-from homeassistant.const import (
-    EVENT_STATE_CHANGED,
-)
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
 
 from .const import (
+    COMMAND_SETTLE_MAX_DELAY,
+    COMMAND_SETTLE_TIME,
+    ECHO_LOOP_MAX,
+    ECHO_LOOP_WINDOW,
+    INBOUND_QUEUE_SIZE,
+    INITIAL_PUBLISH_WINDOW,
+    INITIAL_SYNC_CHUNK,
     INTERVAL_PING_RECEIVE,
     INTERVAL_PING_SEND,
     MAX_PING_LOST,
     MQTT_HOST,
     MQTT_KEEPALIVE,
     MQTT_PORT,
+    MQTT_RECONNECT_MAX_DELAY,
+    MQTT_RECONNECT_MIN_DELAY,
+    MQTT_RECONNECT_RESET_TIME,
+    MQTT_SUBSCRIBE_CHUNK,
+    PRIORITY_WINDOW,
+    PUBLISH_BUCKET_SIZE,
+    PUBLISH_MAX_DELAY,
+    PUBLISH_RATE,
     TOPIC_PING,
     TOPIC_PUBLISH,
 )
 
-from .sync import Sync
+from .sync import ControllableSync, Sync
+from .utils import TokenBucket
 
 _LOGGING = logging.getLogger(__name__)
 
@@ -32,17 +49,72 @@ class BemfaMqtt:
     """Set up mqtt connections to bemfa service, subscribe topcs and publish messages."""
 
     def __init__(
-        self, hass: HomeAssistant, uid: str, entity_ids: list[str] | None
+        self, hass: HomeAssistant, uid: str, persistent_session: bool = False
     ) -> None:
         """Initialize."""
         self._hass = hass
 
-        # Init MQTT connection
-        self._mqttc = mqtt.Client(uid, mqtt.MQTTv311)
+        # Init MQTT connection, its socket is driven by hass event loop instead of a network thread.
+        # With a persistent session, bemfa service keeps our subscriptions and queues commands while we are offline.
+        self._persistent_session = persistent_session
+        self._mqttc = mqtt.Client(
+            uid, clean_session=not persistent_session, protocol=mqtt.MQTTv311
+        )
+        self._mqttc.on_socket_open = self._mqtt_on_socket_open
+        self._mqttc.on_socket_close = self._mqtt_on_socket_close
+        self._mqttc.on_socket_register_write = self._mqtt_on_socket_register_write
+        self._mqttc.on_socket_unregister_write = self._mqtt_on_socket_unregister_write
+        self._misc_task: asyncio.Task | None = None
+        self._connect_task: asyncio.Task | None = None
+        # attempts since last stable connection, and when we got connected
+        self._connect_attempts: int = 0
+        self._connected_at: float | None = None
+        self._running: bool = False
 
         self._topic_to_sync: dict[str, Sync] = {}
+        # latest msg of each topic received before syncs are started, None once started.
+        # With a persistent session, bemfa service delivers queued commands right after connected.
+        self._early_msgs: dict[str, mqtt.MQTTMessage] | None = {}
+        # topics created while offline
+        self._unsubscribed_topics: set[str] = set()
+
+        # reverse index for state change dispatching: entity_id -> syncs watching it
+        self._entity_to_syncs: dict[str, set[Sync]] = {}
+        # entity ids each topic was indexed with, sync config may change before modify_sync
+        self._topic_to_watched: dict[str, list[str]] = {}
+        # last msg bemfa service holds for each topic, to skip duplicate publishes
+        self._topic_to_msg: dict[str, str] = {}
+        # coalescing publishes, topic -> (timer, deadline)
+        self._pending_publishes: dict[str, tuple[asyncio.TimerHandle, float]] = {}
+        # rate limited publishes, topic -> msg, in order of (commanded, others)
+        self._publish_queues: tuple[dict[str, str], dict[str, str]] = ({}, {})
+        self._publish_bucket = TokenBucket(
+            PUBLISH_BUCKET_SIZE, PUBLISH_RATE, hass.loop.time()
+        )
+        self._publish_timer: asyncio.TimerHandle | None = None
+        # when did we receive last command of each topic
+        self._topic_to_commanded_at: dict[str, float] = {}
+        # msgs received, (topic, msg), resolved one by one in hass event loop
+        self._inbound_queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(
+            INBOUND_QUEUE_SIZE
+        )
+        self._inbound_task: asyncio.Task | None = None
+        # topic -> (mid, msg) last received, kept across reconnects to detect redelivery
+        self._topic_to_received: dict[str, tuple[int, str]] = {}
+        # topics resolving msgs, topic -> task; and the latest msg waiting for each of them
+        self._resolving_tasks: dict[str, asyncio.Task] = {}
+        self._topic_to_waiting_msg: dict[str, str] = {}
+        # topics resolving commands, their states are published after the devices settle
+        self._commanding_topics: set[str] = set()
+        self._settling_topics: set[str] = set()
+        # when did we publish a state to correct the command of each topic
+        self._topic_to_echoed_at: dict[str, deque[float]] = {}
+        # when did we publish last msg of each topic, and heartbeat timers to publish again
+        self._topic_to_published_at: dict[str, float] = {}
+        self._heartbeat_timers: dict[str, asyncio.TimerHandle] = {}
+        # state change trackers of watched entities, entity_id -> unsubscriber
+        self._entity_trackers: dict[str, CALLBACK_TYPE] = {}
 
-        self._remove_listener: Any = None
         self._ping_publish_timer: Any = None
         self._ping_receive_timer: Any = None
         self._ping_lost: int = 0
@@ -50,44 +122,261 @@ class BemfaMqtt:
     def create_sync(self, sync: Sync):
         """Add an topic to our watching list."""
         self._topic_to_sync[sync.topic] = sync
-        self._mqttc.publish(
-            TOPIC_PUBLISH.format(topic=sync.topic),
-            sync.generate_msg(),
-        )
-        self._mqttc.subscribe(sync.topic, 1)
+        self._index_sync(sync)
+        self._publish_sync(sync, force=True)
+        if self._mqttc.subscribe(sync.topic, 1)[0] != mqtt.MQTT_ERR_SUCCESS:
+            # subscribe it when connected, even if bemfa service kept our session
+            self._unsubscribed_topics.add(sync.topic)
+
+    async def async_create_syncs(self, syncs: list[Sync]):
+        """Add many topics to our watching list without flooding hass and bemfa service.
+        Topics are subscribed first in chunks, then their states are published spread over a window.
+        """
+        for i in range(0, len(syncs), INITIAL_SYNC_CHUNK):
+            chunk = syncs[i : i + INITIAL_SYNC_CHUNK]
+            for sync in chunk:
+                self._topic_to_sync[sync.topic] = sync
+                self._index_sync(sync)
+            self._subscribe([sync.topic for sync in chunk])
+            await asyncio.sleep(0)
+
+        now = self._hass.loop.time()
+        for (i, sync) in enumerate(syncs):
+            if self._topic_to_sync.get(sync.topic) is not sync:
+                continue  # destroyed or replaced meanwhile
+            self._cancel_pending_publish(sync.topic)
+            when = now + INITIAL_PUBLISH_WINDOW * i / len(syncs)
+            self._pending_publishes[sync.topic] = (
+                self._hass.loop.call_at(when, self._flush_publish, sync.topic),
+                when,
+            )
+
+    def syncs_started(self):
+        """Resolve msgs received before syncs were started, drop those of unknown topics."""
+        if self._early_msgs is None:
+            return
+        (early_msgs, self._early_msgs) = (self._early_msgs, None)
+        for message in early_msgs.values():
+            if message.topic in self._topic_to_sync:
+                self._receive_msg(message)
 
     def modify_sync(self, sync: Sync):
         """Modify a sync."""
         if sync.topic in self._topic_to_sync:
             self._topic_to_sync[sync.topic] = sync
-            self._mqttc.publish(
-                TOPIC_PUBLISH.format(topic=sync.topic),
-                sync.generate_msg(),
-            )
+            self._index_sync(sync)
+            self._publish_sync(sync)
 
     def destroy_sync(self, topic: str):
         """Remove an topic from our watching list."""
         if topic in self._topic_to_sync:
             self._topic_to_sync.pop(topic)
+        self._unindex_sync(topic)
+        self._topic_to_msg.pop(topic, None)
+        self._topic_to_received.pop(topic, None)
+        self._topic_to_commanded_at.pop(topic, None)
+        self._topic_to_echoed_at.pop(topic, None)
+        self._topic_to_published_at.pop(topic, None)
+        if topic in self._heartbeat_timers:
+            self._heartbeat_timers.pop(topic).cancel()
+        self._settling_topics.discard(topic)
+        self._cancel_pending_publish(topic)
+        for queue in self._publish_queues:
+            queue.pop(topic, None)
+        self._unsubscribed_topics.discard(topic)
         self._mqttc.unsubscribe(topic)
 
+    def _schedule_publish(self, sync: Sync):
+        """Publish state msg of a sync after its coalescing window."""
+        if sync.topic in self._commanding_topics:
+            return  # publish once the command settled
+
+        settling = sync.topic in self._settling_topics
+        window = COMMAND_SETTLE_TIME if settling else sync.publish_window
+
+        # keep minimum interval between publishes
+        now = self._hass.loop.time()
+        published_at = self._topic_to_published_at.get(sync.topic)
+        earliest = (
+            now if published_at is None else published_at + sync.min_publish_interval
+        )
+        if window <= 0 and earliest <= now:
+            self._publish_sync(sync)
+            return
+
+        if sync.topic in self._pending_publishes:
+            (timer, deadline) = self._pending_publishes[sync.topic]
+            timer.cancel()
+        else:
+            deadline = now + (
+                COMMAND_SETTLE_MAX_DELAY if settling else PUBLISH_MAX_DELAY
+            )
+        self._pending_publishes[sync.topic] = (
+            self._hass.loop.call_at(
+                max(min(now + window, deadline), earliest),
+                self._flush_publish,
+                sync.topic,
+            ),
+            deadline,
+        )
+
+    def _flush_publish(self, topic: str):
+        self._pending_publishes.pop(topic, None)
+        if topic not in self._topic_to_sync:
+            return
+        sync = self._topic_to_sync[topic]
+
+        if topic in self._settling_topics:
+            self._settling_topics.discard(topic)
+            # state differs from the command, eg. rounded by device or by our encoding
+            if sync.generate_msg() != self._topic_to_msg.get(topic):
+                now = self._hass.loop.time()
+                echoed_at = self._topic_to_echoed_at.setdefault(topic, deque())
+                while echoed_at and echoed_at[0] < now - ECHO_LOOP_WINDOW:
+                    echoed_at.popleft()
+                if len(echoed_at) >= ECHO_LOOP_MAX:
+                    _LOGGING.warning(
+                        "State of %s keeps differing from commands, stop correcting bemfa service",
+                        sync.entity_id,
+                    )
+                    return
+                echoed_at.append(now)
+
+        self._publish_sync(sync)
+
+    def _cancel_pending_publish(self, topic: str):
+        if topic in self._pending_publishes:
+            self._pending_publishes.pop(topic)[0].cancel()
+
+    def _publish_sync(self, sync: Sync, force: bool = False):
+        """Publish state msg of a sync, skip it if bemfa service holds the same msg.
+        Set force to publish anyway, eg. when (re)connected.
+        """
+        if not force and not sync.has_significant_change():
+            return
+        msg = sync.generate_msg()
+        sync.msg_published()
+        (commanded, others) = self._publish_queues
+        if not force and commanded.get(sync.topic, others.get(sync.topic)) == msg:
+            return  # queued already
+
+        # drop outdated queued msg
+        commanded.pop(sync.topic, None)
+        others.pop(sync.topic, None)
+        if not force and self._topic_to_msg.get(sync.topic) == msg:
+            return
+
+        # echoes of commands go ahead of other msgs
+        if (
+            self._hass.loop.time()
+            < self._topic_to_commanded_at.get(sync.topic, -PRIORITY_WINDOW)
+            + PRIORITY_WINDOW
+        ):
+            commanded[sync.topic] = msg
+        else:
+            others[sync.topic] = msg
+        if self._publish_timer is None:
+            self._flush_publish_queues()
+
+    def _flush_publish_queues(self):
+        """Publish queued msgs while we have tokens."""
+        self._publish_timer = None
+        for queue in self._publish_queues:
+            while queue:
+                now = self._hass.loop.time()
+                if not self._publish_bucket.consume(now):
+                    self._publish_timer = self._hass.loop.call_later(
+                        self._publish_bucket.wait_time(now),
+                        self._flush_publish_queues,
+                    )
+                    return
+                topic = next(iter(queue))
+                msg = queue.pop(topic)
+                if (
+                    self._mqttc.publish(TOPIC_PUBLISH.format(topic=topic), msg).rc
+                    == mqtt.MQTT_ERR_SUCCESS
+                ):
+                    self._topic_to_msg[topic] = msg
+                    self._topic_to_published_at[topic] = now
+                    self._schedule_heartbeat(topic)
+
+    def _schedule_heartbeat(self, topic: str):
+        """Publish state msg again if nothing published in max interval."""
+        if topic in self._heartbeat_timers:
+            self._heartbeat_timers.pop(topic).cancel()
+        sync = self._topic_to_sync.get(topic)
+        if sync is None or sync.max_publish_interval <= 0:
+            return
+        self._heartbeat_timers[topic] = self._hass.loop.call_later(
+            sync.max_publish_interval, self._heartbeat, topic
+        )
+
+    def _heartbeat(self, topic: str):
+        self._heartbeat_timers.pop(topic, None)
+        if topic in self._topic_to_sync:
+            self._publish_sync(self._topic_to_sync[topic], force=True)
+
+    def _index_sync(self, sync: Sync):
+        """(Re)index watched entity ids of a sync."""
+        self._unindex_sync(sync.topic)
+        watched = sync.get_watched_entity_ids()
+        self._topic_to_watched[sync.topic] = watched
+        for entity_id in watched:
+            if entity_id not in self._entity_to_syncs:
+                self._entity_to_syncs[entity_id] = set()
+                self._entity_trackers[entity_id] = async_track_state_change_event(
+                    self._hass, entity_id, self._state_listener
+                )
+            self._entity_to_syncs[entity_id].add(sync)
+
+    def _unindex_sync(self, topic: str):
+        """Remove a topic from the reverse index."""
+        for entity_id in self._topic_to_watched.pop(topic, []):
+            syncs = self._entity_to_syncs.get(entity_id)
+            if syncs is None:
+                continue
+            for sync in [sync for sync in syncs if sync.topic == topic]:
+                syncs.discard(sync)
+            if not syncs:
+                del self._entity_to_syncs[entity_id]
+                self._entity_trackers.pop(entity_id)()
+
     def connect(self) -> None:
-        """Connect to Bamfa service."""
+        """Connect to Bamfa service in background."""
+        self._running = True
+
         # Send heartbeat packages to check the connection first in case we failed to make mqtt connection
         self._ping()
 
-        self._mqttc.connect(MQTT_HOST, MQTT_PORT, MQTT_KEEPALIVE)
+        self._mqttc.on_connect = self._mqtt_on_connect
+        self._mqttc.on_disconnect = self._mqtt_on_disconnect
         self._mqttc.on_message = self._mqtt_on_message
-
-        self._mqttc.loop_start()
-
-        # Listen for state changes
-        self._remove_listener = self._hass.bus.async_listen(
-            EVENT_STATE_CHANGED, self._state_listener
+        if self._inbound_task is None:
+            self._inbound_task = self._hass.loop.create_task(self._resolve_inbound())
+        self._connect_task = self._hass.async_create_background_task(
+            self._async_connect(), "bemfa mqtt connect"
         )
 
-        # Listen for heartbeat packages
-        self._mqttc.subscribe(TOPIC_PING, 1)
+    async def _async_connect(self) -> None:
+        """Make mqtt connection in executor, retry with exponential backoff and jitter."""
+        while True:
+            if self._connect_attempts > 0:
+                await asyncio.sleep(
+                    min(
+                        MQTT_RECONNECT_MIN_DELAY
+                        * 2 ** (self._connect_attempts - 1)
+                        * random.uniform(1, 1.5),
+                        MQTT_RECONNECT_MAX_DELAY,
+                    )
+                )
+            self._connect_attempts += 1
+            try:
+                await self._hass.async_add_executor_job(
+                    self._mqttc.connect, MQTT_HOST, MQTT_PORT, MQTT_KEEPALIVE
+                )
+                return
+            except OSError as err:
+                _LOGGING.warning("Failed to connect to bemfa service: %s", err)
 
     def _ping(self):
         async def _receive_job():
@@ -95,7 +384,9 @@ class BemfaMqtt:
             self._ping_lost += 1
             if self._ping_lost == MAX_PING_LOST:
                 self._ping_lost = 0
-                self._reconnect()
+                # a connecting task is retrying already
+                if self._connect_task is None or self._connect_task.done():
+                    self._reconnect()
 
         async def _publish_job():
             await asyncio.sleep(INTERVAL_PING_SEND)
@@ -106,13 +397,44 @@ class BemfaMqtt:
         self._ping_publish_timer = asyncio.ensure_future(_publish_job())
 
     def _reconnect(self):
-        self.disconnect()
+        """Reconnect with syncs kept, they are subscribed and published again on connected."""
+        # never reconnect at once, start backoff over only if the connection was stable,
+        # or a broker accepting then dropping us would get a reconnect storm
+        if (
+            self._connected_at is not None
+            and self._hass.loop.time() - self._connected_at >= MQTT_RECONNECT_RESET_TIME
+        ):
+            self._connect_attempts = 0
+        self._connected_at = None
+        self._connect_attempts = max(self._connect_attempts, 1)
+        self._close()
         self.connect()
-        for sync in self._topic_to_sync.values():
-            self.create_sync(sync)
 
     def disconnect(self) -> None:
         """Disconnect from Bamfa service."""
+        self._close()
+
+        if self._inbound_task is not None:
+            self._inbound_task.cancel()
+            self._inbound_task = None
+        for task in self._resolving_tasks.values():
+            task.cancel()
+        self._resolving_tasks.clear()
+        self._topic_to_waiting_msg.clear()
+        self._early_msgs = None
+
+        # Unlisten for state changes
+        for unsub in self._entity_trackers.values():
+            unsub()
+        self._entity_trackers.clear()
+        self._entity_to_syncs.clear()
+        self._topic_to_watched.clear()
+
+    def _close(self) -> None:
+        self._running = False
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+            self._connect_task = None
 
         # Remove timers
         if self._ping_publish_timer is not None:
@@ -120,25 +442,112 @@ class BemfaMqtt:
         if self._ping_receive_timer is not None:
             self._ping_receive_timer.cancel()
 
-        # Unlisten for state changes
-        if self._remove_listener is not None:
-            self._remove_listener()
+        # Drop coalescing publishes, states are published again on connected
+        for (timer, _deadline) in self._pending_publishes.values():
+            timer.cancel()
+        self._pending_publishes.clear()
+        self._settling_topics.clear()
+        for timer in self._heartbeat_timers.values():
+            timer.cancel()
+        self._heartbeat_timers.clear()
+        if self._publish_timer is not None:
+            self._publish_timer.cancel()
+            self._publish_timer = None
+        for queue in self._publish_queues:
+            queue.clear()
 
-        # Destroy MQTT connection
-        self._mqttc.loop_stop()
+        # Destroy MQTT connection, socket closes once the disconnect packet is written
         self._mqttc.disconnect()
 
-    def _state_listener(self, event):
-        new_state = event.data.get("new_state")
-        if new_state is None:
+    def _mqtt_on_connect(self, client, _userdata, flags, result_code) -> None:
+        if not self._running:
+            # connected in executor after we stopped
+            client.disconnect()
             return
-        entity_id = new_state.entity_id
-        for (topic, sync) in self._topic_to_sync.items():
-            if entity_id in sync.get_watched_entity_ids():
-                self._mqttc.publish(
-                    TOPIC_PUBLISH.format(topic=topic),
-                    sync.generate_msg(),
-                )
+        if result_code != mqtt.CONNACK_ACCEPTED:
+            _LOGGING.warning(
+                "Bemfa service refused connection: %s",
+                mqtt.connack_string(result_code),
+            )
+            return
+        self._connected_at = self._hass.loop.time()
+
+        # bemfa service kept our subscriptions and msgs we published
+        if self._persistent_session and flags.get("session present"):
+            topics = list(self._unsubscribed_topics)
+            self._unsubscribed_topics.clear()
+            self._subscribe(topics)
+            for sync in self._topic_to_sync.values():
+                self._publish_sync(sync)
+            return
+
+        # Listen for heartbeat packages and all syncs
+        self._unsubscribed_topics.clear()
+        self._subscribe([TOPIC_PING, *self._topic_to_sync])
+
+        for sync in self._topic_to_sync.values():
+            self._publish_sync(sync, force=True)
+
+    def _subscribe(self, topics: list[str]) -> None:
+        """Subscribe topics with as few packets as we can."""
+        for i in range(0, len(topics), MQTT_SUBSCRIBE_CHUNK):
+            chunk = topics[i : i + MQTT_SUBSCRIBE_CHUNK]
+            if (
+                self._mqttc.subscribe([(topic, 1) for topic in chunk])[0]
+                != mqtt.MQTT_ERR_SUCCESS
+            ):
+                # subscribe them when connected, even if bemfa service kept our session
+                self._unsubscribed_topics.update(chunk)
+
+    def _mqtt_on_disconnect(self, _client, _userdata, result_code) -> None:
+        if self._running and result_code != mqtt.MQTT_ERR_SUCCESS:
+            _LOGGING.warning("Lost connection to bemfa service, reconnecting")
+            self._reconnect()
+
+    # Socket callbacks may be called in executor while connecting
+    def _call_in_loop(self, func: Callable, *args: Any) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._hass.loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def _mqtt_on_socket_open(self, client, _userdata, sock) -> None:
+        def _open():
+            self._hass.loop.add_reader(sock, client.loop_read)
+            self._misc_task = self._hass.loop.create_task(self._misc_loop())
+
+        self._call_in_loop(_open)
+
+    def _mqtt_on_socket_close(self, _client, _userdata, sock) -> None:
+        def _close():
+            self._hass.loop.remove_reader(sock)
+            if self._misc_task is not None:
+                self._misc_task.cancel()
+                self._misc_task = None
+
+        self._call_in_loop(_close)
+
+    def _mqtt_on_socket_register_write(self, client, _userdata, sock) -> None:
+        self._call_in_loop(self._hass.loop.add_writer, sock, client.loop_write)
+
+    def _mqtt_on_socket_unregister_write(self, _client, _userdata, sock) -> None:
+        self._call_in_loop(self._hass.loop.remove_writer, sock)
+
+    async def _misc_loop(self) -> None:
+        """Let paho handle its keepalive and retries every second."""
+        while self._mqttc.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    @callback
+    def _state_listener(self, event: Event):
+        entity_id = event.data["entity_id"]
+        new_state = event.data.get("new_state")
+        for sync in self._entity_to_syncs.get(entity_id, ()):
+            sync.state_changed(entity_id, new_state)
+            if new_state is not None:
+                self._schedule_publish(sync)
 
     def _mqtt_on_message(self, _mqtt_client, _userdata, message) -> None:
         if message.topic == TOPIC_PING:
@@ -148,4 +557,67 @@ class BemfaMqtt:
             return
 
         if message.topic in self._topic_to_sync:
-            self._topic_to_sync[message.topic].resolve_msg(message.payload.decode())
+            self._receive_msg(message)
+        elif self._early_msgs is not None:
+            # its sync is not started yet, only the latest msg matters
+            self._early_msgs[message.topic] = message
+
+    def _receive_msg(self, message: mqtt.MQTTMessage) -> None:
+        msg = message.payload.decode()
+        if self._is_duplicate_msg(message, msg):
+            return
+        # bemfa service holds the received msg now, publish if our state differs
+        self._topic_to_msg[message.topic] = msg
+        self._topic_to_commanded_at[message.topic] = self._hass.loop.time()
+        if self._inbound_queue.full():
+            (topic, dropped) = self._inbound_queue.get_nowait()
+            _LOGGING.warning("Too many msgs received, drop %s of %s", dropped, topic)
+        self._inbound_queue.put_nowait((message.topic, msg))
+
+    def _is_duplicate_msg(self, message: mqtt.MQTTMessage, msg: str) -> bool:
+        """Whether it is a QoS 1 msg redelivered, eg. after reconnected, which we received already."""
+        received = (message.mid, msg)
+        if message.dup and self._topic_to_received.get(message.topic) == received:
+            return True
+        self._topic_to_received[message.topic] = received
+        return False
+
+    async def _resolve_inbound(self) -> None:
+        """Dispatch msgs received, service calls never block reading from socket."""
+        while True:
+            (topic, msg) = await self._inbound_queue.get()
+            if not isinstance(self._topic_to_sync.get(topic), ControllableSync):
+                continue
+            if topic in self._resolving_tasks:
+                # only the latest msg matters, replace the waiting one
+                self._topic_to_waiting_msg[topic] = msg
+            else:
+                self._resolving_tasks[topic] = self._hass.loop.create_task(
+                    self._resolve_topic(topic, msg)
+                )
+
+    async def _resolve_topic(self, topic: str, msg: str) -> None:
+        """Resolve msgs of a topic one by one, in parallel with other topics."""
+        try:
+            # hold state changes caused by the command
+            self._commanding_topics.add(topic)
+            self._settling_topics.discard(topic)
+            self._cancel_pending_publish(topic)
+            while True:
+                sync = self._topic_to_sync.get(topic)
+                if not isinstance(sync, ControllableSync):
+                    return
+                try:
+                    await sync.async_resolve_msg(msg)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGING.exception("Failed to resolve msg %s of %s", msg, topic)
+                if topic not in self._topic_to_waiting_msg:
+                    return
+                msg = self._topic_to_waiting_msg.pop(topic)
+        finally:
+            self._resolving_tasks.pop(topic, None)
+            self._commanding_topics.discard(topic)
+            if self._running and topic in self._topic_to_sync:
+                self._topic_to_commanded_at[topic] = self._hass.loop.time()
+                self._settling_topics.add(topic)
+                self._schedule_publish(self._topic_to_sync[topic])
@@ -1,14 +1,19 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
+import asyncio
 import logging
 
-from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
-from homeassistant.core import CoreState, Event, HomeAssistant
-from .sync import SYNC_TYPES, Sync
-from .const import OPTIONS_NAME, TOPIC_PING
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED, EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, CoreState, Event, HomeAssistant, callback
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+from .sync import SYNC_TYPES, Sync, forget_topics, generate_topics
+from .const import HTTP_CONCURRENCY, OPTIONS_NAME, TOPIC_PING
 from .http import BemfaHttp
 from .mqtt import BemfaMqtt
+from .storage import BemfaStorage
 
 _LOGGING = logging.getLogger(__name__)
 
@@ -16,36 +21,69 @@ _LOGGING = logging.getLogger(__name__)
 class BemfaService:
     """Service handles mqtt topocs and connection."""
 
-    def __init__(self, hass: HomeAssistant, uid: str) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        uid: str,
+        persistent_session: bool = False,
+    ) -> None:
         """Initialize."""
         self._hass = hass
         self._bemfa_http = BemfaHttp(hass, uid)
-        self._bemfa_mqtt = BemfaMqtt(hass, uid, None)
+        self._bemfa_mqtt = BemfaMqtt(hass, uid, persistent_session)
+        self._storage = BemfaStorage(hass, entry_id)
+
+        self._unsub_entity_registry: CALLBACK_TYPE | None = None
+        self._unsub_state_changed: CALLBACK_TYPE | None = None
+
+        # config of each topic, stored in integration options
+        self._config: dict[str, dict[str, str]] = {}
+
+        # topics we started syncs from, saved ones or those fetched from bemfa service
+        self._topics: dict[str, str] = {}
+        self._reconcile_task: asyncio.Task | None = None
+        self._start_task: asyncio.Task | None = None
+        self._started = False
 
     async def async_start(self, config: dict[str, dict[str, str]]) -> None:
         """Start the servcie, called when Bemfa component starts."""
-        all_topics = await self._bemfa_http.async_fetch_all_topics()
+        await self._storage.async_load()
+        self._unsub_entity_registry = self._hass.bus.async_listen(
+            EVENT_ENTITY_REGISTRY_UPDATED, self._entity_registry_updated
+        )
+        self._config = config
 
-        # make sure we have the ping topic for heartbeat packages
-        if TOPIC_PING not in all_topics:
-            await self._bemfa_http.async_create_topic(TOPIC_PING, "ping")
-        else:
-            # This topic does not matter to entities, remove it for following steps
-            del all_topics[TOPIC_PING]
-
-        # time to make mqtt connection
+        # mqtt connection goes on in background while we get topics,
+        # syncs created before connected are subscribed once connected
         self._bemfa_mqtt.connect()
 
+        # start from topics saved last time, bring them up to date later in background,
+        # so that a slow bemfa api does not delay hass startup
+        snapshot = self._storage.get_topics()
+        if snapshot is None:
+            try:
+                self._topics = await self._async_fetch_live_topics()
+            except Exception:
+                self.stop()
+                raise
+        else:
+            self._topics = snapshot
+            self._reconcile_task = self._hass.async_create_background_task(
+                self._async_reconcile_topics(), "bemfa reconcile topics"
+            )
+
         # When sync an entity to bemfa service,
         # we must make sure this entity's state is available, means this entity has inited.
         # So a check of hass state is necessary.
         def _start(event: Event | None = None):
-            for sync in self.collect_supported_syncs():
-                if sync.topic in all_topics:
-                    sync.name = all_topics[sync.topic]
-                    if sync.topic in config:
-                        sync.config = config[sync.topic]
-                    self._bemfa_mqtt.create_sync(sync)
+            self._started = True
+            self._unsub_state_changed = self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._state_changed
+            )
+            self._start_task = self._hass.async_create_background_task(
+                self._async_start(), "bemfa start syncs"
+            )
 
         if self._hass.state == CoreState.running:
             _start()
@@ -53,11 +91,81 @@ class BemfaService:
             # for situations when hass restarts
             self._hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _start)
 
+    async def _async_start(self) -> None:
+        try:
+            await self._async_start_syncs(self.collect_synced_syncs(self._topics))
+
+            # entities of topics matching none in last full scan may be loaded this time
+            unknown_topics = {
+                topic: name
+                for (topic, name) in self._topics.items()
+                if self._storage.is_unknown_manifest(topic)
+            }
+            if unknown_topics:
+                await self._async_start_syncs(self._scan_synced_syncs(unknown_topics))
+        finally:
+            # commands may have arrived before their syncs
+            self._bemfa_mqtt.syncs_started()
+
+    async def _async_start_syncs(self, syncs: list[Sync]) -> None:
+        for sync in syncs:
+            if sync.topic in self._config:
+                sync.config = self._config[sync.topic]
+        await self._bemfa_mqtt.async_create_syncs(syncs)
+
+    async def _async_fetch_live_topics(self) -> dict[str, str]:
+        """Fetch topics from bemfa service and save a snapshot of them."""
+        all_topics = await self._bemfa_http.async_fetch_all_topics(refresh=True)
+
+        # make sure we have the ping topic for heartbeat packages
+        if TOPIC_PING not in all_topics:
+            # nothing else waits for it
+            self._hass.async_create_background_task(
+                self._bemfa_http.async_create_topic(TOPIC_PING, "ping"),
+                "bemfa create ping topic",
+            )
+        else:
+            # This topic does not matter to entities, remove it for following steps
+            del all_topics[TOPIC_PING]
+
+        self._storage.set_topics(all_topics)
+        return all_topics
+
+    async def _async_reconcile_topics(self) -> None:
+        """Apply changes between topics we started from and those in bemfa service."""
+        try:
+            all_topics = await self._async_fetch_live_topics()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            _LOGGING.warning(
+                "Failed to fetch topics from bemfa service, keep using saved ones: %s",
+                err,
+            )
+            return
+
+        if self._started:
+            # let paced start finish, or it would add syncs of topics destroyed here
+            if self._start_task is not None:
+                await self._start_task
+            for topic in self._topics.keys() - all_topics.keys():
+                self._bemfa_mqtt.destroy_sync(topic)
+            await self._async_start_syncs(
+                self.collect_synced_syncs(
+                    {
+                        topic: name
+                        for (topic, name) in all_topics.items()
+                        if topic not in self._topics
+                    }
+                )
+            )
+        self._topics = all_topics
+
     async def async_fetch_all_topics(
-        self,
+        self, refresh: bool = False
     ) -> dict[str, str]:  # topic -> name
-        """Fetch topics we created from benfa servcie, include which do not exist in hass."""
-        all_topics = await self._bemfa_http.async_fetch_all_topics()
+        """Fetch topics we created from benfa servcie, include which do not exist in hass.
+        Set refresh to skip the cache and fetch them from bemfa service.
+        """
+        all_topics = await self._bemfa_http.async_fetch_all_topics(refresh)
 
         if TOPIC_PING in all_topics:
             del all_topics[TOPIC_PING]
@@ -71,6 +179,41 @@ class BemfaService:
             syncs.extend(sync_type.collect_supported_syncs(self._hass))
         return sorted(syncs, key=lambda item: item.entity_id)
 
+    def collect_synced_syncs(self, all_topics: dict[str, str]) -> list[Sync]:
+        """Collect hass-to-bemfa syncs of topics we created, named as in bemfa service.
+        Syncs are built from the manifest, fall back to a full scan to repair it.
+        """
+        syncs: list[Sync] = []
+        for (topic, name) in all_topics.items():
+            if not self._storage.in_manifest(topic):
+                return self._scan_synced_syncs(all_topics)
+            manifest = self._storage.get_manifest(topic)
+            if manifest is None:
+                continue  # matches no hass entity in last full scan
+            (sync_type, entity_id) = manifest
+            sync = (
+                SYNC_TYPES[sync_type].get_sync(self._hass, entity_id)
+                if sync_type in SYNC_TYPES
+                else None
+            )
+            if sync is not None and sync.topic == topic:
+                sync.name = name
+                syncs.append(sync)
+        return sorted(syncs, key=lambda item: item.entity_id)
+
+    def _scan_synced_syncs(self, all_topics: dict[str, str]) -> list[Sync]:
+        syncs: list[Sync] = []
+        for sync in self.collect_supported_syncs():
+            if sync.topic in all_topics:
+                sync.name = all_topics[sync.topic]
+                syncs.append(sync)
+        self._storage.set_manifest(syncs)
+        synced_topics = {sync.topic for sync in syncs}
+        self._storage.set_unknown_manifest(
+            [topic for topic in all_topics if topic not in synced_topics]
+        )
+        return syncs
+
     async def async_create_sync(self, sync: Sync, user_input: dict[str, str]):
         """Create a topic to bemfa service and keep communication by mqtt.
         Except name, we store other config details in hass side.
@@ -78,23 +221,120 @@ class BemfaService:
         sync.name = user_input.pop(OPTIONS_NAME)
         sync.config = user_input
         await self._bemfa_http.async_create_topic(sync.topic, sync.name)
+        self._sync_created(sync)
+
+    async def async_create_syncs(
+        self, syncs: list[Sync], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Create topics of syncs already named and configured.
+        Return error of each topic, None if succeeded.
+        """
+        results = await self._bemfa_http.async_create_topics(
+            {sync.topic: sync.name for sync in syncs}, concurrency
+        )
+        for sync in syncs:
+            if results[sync.topic] is None:
+                self._sync_created(sync)
+        _log_errors("create", results)
+        return results
+
+    def _sync_created(self, sync: Sync) -> None:
+        self._storage.set_manifest([sync])
+        self._topics[sync.topic] = sync.name
+        self._storage.set_topics(self._topics)
         self._bemfa_mqtt.create_sync(sync)
 
     async def async_modify_sync(self, sync: Sync, user_input: dict[str, str]):
         """Modify topic and/or config of a sync."""
         name = user_input.pop(OPTIONS_NAME)
         if sync.name != name:
-            sync.name = name
             await self._bemfa_http.async_rename_topic(sync.topic, name)
+            sync.name = name
+            self._topics[sync.topic] = name
+            self._storage.set_topics(self._topics)
         if sync.config != user_input:
             sync.config = user_input
             self._bemfa_mqtt.modify_sync(sync)
 
-    async def async_destroy_sync(self, topic: str):
-        """Delete a topic from bemfa service and distroy mqtt communication."""
-        await self._bemfa_http.async_del_topic(topic)
-        self._bemfa_mqtt.destroy_sync(topic)
+    async def async_rename_syncs(
+        self, syncs: list[Sync], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Rename topics of syncs to their names.
+        Return error of each topic, None if succeeded.
+        """
+        results = await self._bemfa_http.async_rename_topics(
+            {sync.topic: sync.name for sync in syncs}, concurrency
+        )
+        for sync in syncs:
+            if results[sync.topic] is None:
+                self._topics[sync.topic] = sync.name
+        self._storage.set_topics(self._topics)
+        _log_errors("rename", results)
+        return results
+
+    async def async_destroy_syncs(
+        self, topics: list[str], concurrency: int = HTTP_CONCURRENCY
+    ) -> dict[str, Exception | None]:
+        """Delete topics from bemfa service and distroy mqtt communication.
+        Return error of each topic, None if succeeded.
+        """
+        results = await self._bemfa_http.async_del_topics(topics, concurrency)
+        destroyed = [topic for topic in topics if results[topic] is None]
+        self._storage.remove_manifest(destroyed)
+        for topic in destroyed:
+            self._topics.pop(topic, None)
+            self._bemfa_mqtt.destroy_sync(topic)
+        self._storage.set_topics(self._topics)
+        _log_errors("delete", results)
+        return results
+
+    @callback
+    def _state_changed(self, event: Event) -> None:
+        """Start sync of a topic matching no entity in last full scan once its entity shows up,
+        eg. loaded by an integration set up late.
+        """
+        if event.data["old_state"] is not None or event.data["new_state"] is None:
+            return
+        entity_id: str = event.data["entity_id"]
+        for topic in generate_topics(entity_id):
+            if topic not in self._topics or not self._storage.is_unknown_manifest(
+                topic
+            ):
+                continue
+            for sync_type in SYNC_TYPES.values():
+                sync = sync_type.get_sync(self._hass, entity_id)
+                if sync is not None and sync.topic == topic:
+                    sync.name = self._topics[topic]
+                    if topic in self._config:
+                        sync.config = self._config[topic]
+                    self._storage.set_manifest([sync])
+                    self._bemfa_mqtt.create_sync(sync)
+                    break
+
+    @callback
+    def _entity_registry_updated(self, event: Event) -> None:
+        """Cached topics of an entity are useless once it is removed or renamed."""
+        if event.data["action"] == "remove":
+            forget_topics(event.data["entity_id"])
+        elif event.data["action"] == "update" and "old_entity_id" in event.data:
+            forget_topics(event.data["old_entity_id"])
 
     def stop(self) -> None:
         """Stop the service, called when Bemfa component stops."""
+        for task in (self._reconcile_task, self._start_task):
+            if task is not None:
+                task.cancel()
+        self._reconcile_task = None
+        self._start_task = None
+        for unsub in (self._unsub_entity_registry, self._unsub_state_changed):
+            if unsub is not None:
+                unsub()
+        self._unsub_entity_registry = None
+        self._unsub_state_changed = None
         self._bemfa_mqtt.disconnect()
+
+
+def _log_errors(action: str, results: dict[str, Exception | None]) -> None:
+    for (topic, err) in results.items():
+        if err is not None:
+            _LOGGING.warning("Failed to %s topic %s: %s", action, topic, err)
@@ -0,0 +1,109 @@
+"""Support for bemfa service."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Final
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import STORAGE_KEY, STORAGE_SAVE_DELAY, STORAGE_VERSION
+from .sync import SYNC_TYPES, Sync
+
+_LOGGING = logging.getLogger(__name__)
+
+# keys of stored data
+MANIFEST: Final = "manifest"
+TOPICS: Final = "topics"
+
+
+class BemfaStorage:
+    """Data of an integration entry persisted in hass storage.
+    Manifest maps each topic we created to its sync type and entity id,
+    since a topic (md5 of entity id) can not tell which entity it syncs,
+    or to None if it matches no hass entity.
+    Topics is a snapshot of topics last fetched, to start without bemfa service.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry_id)
+        )
+        self._manifest: dict[str, tuple[str, str] | None] = {}
+        self._topics: dict[str, str] | None = None
+
+    async def async_load(self) -> None:
+        """Load stored data, called once before using it."""
+        data = await self._store.async_load()
+        if data is not None:
+            self._manifest = {
+                topic: None if manifest is None else tuple(manifest)
+                for (topic, manifest) in data.get(MANIFEST, {}).items()
+            }
+            self._topics = data.get(TOPICS)
+
+    async def async_remove(self) -> None:
+        """Remove stored data, called when the integration entry is removed."""
+        await self._store.async_remove()
+
+    def in_manifest(self, topic: str) -> bool:
+        """Whether a topic is recorded, even if it matches no hass entity."""
+        return topic in self._manifest
+
+    def is_unknown_manifest(self, topic: str) -> bool:
+        """Whether a topic matched no hass entity in last full scan."""
+        return topic in self._manifest and self._manifest[topic] is None
+
+    def get_manifest(self, topic: str) -> tuple[str, str] | None:
+        """Sync type and entity id of a topic, None if unknown."""
+        return self._manifest.get(topic)
+
+    @callback
+    def set_manifest(self, syncs: list[Sync]) -> None:
+        """Record topics of syncs."""
+        for sync in syncs:
+            self._manifest[sync.topic] = (_get_sync_type(sync), sync.entity_id)
+        self._schedule_save()
+
+    @callback
+    def set_unknown_manifest(self, topics: list[str]) -> None:
+        """Record topics matching no hass entity, scan for them again on next start only."""
+        for topic in topics:
+            self._manifest[topic] = None
+        self._schedule_save()
+
+    @callback
+    def remove_manifest(self, topics: list[str]) -> None:
+        """Forget topics destroyed."""
+        for topic in topics:
+            self._manifest.pop(topic, None)
+        self._schedule_save()
+
+    def get_topics(self) -> dict[str, str] | None:
+        """Snapshot of topics (topic -> name), None if never saved."""
+        return None if self._topics is None else self._topics.copy()
+
+    @callback
+    def set_topics(self, topics: dict[str, str]) -> None:
+        """Save snapshot of topics."""
+        self._topics = topics.copy()
+        self._schedule_save()
+
+    @callback
+    def _schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            MANIFEST: {
+                topic: None if manifest is None else list(manifest)
+                for (topic, manifest) in self._manifest.items()
+            },
+            TOPICS: self._topics,
+        }
+
+
+def _get_sync_type(sync: Sync) -> str:
+    return next(key for (key, value) in SYNC_TYPES.items() if value is type(sync))
@@ -1,22 +1,53 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from collections.abc import Mapping, Callable
+from collections.abc import Sequence
 import hashlib
 from typing import Any
 import voluptuous as vol
 from homeassistant.const import ATTR_ENTITY_ID
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, State
 from homeassistant.util.decorator import Registry
-from homeassistant.util.read_only_dict import ReadOnlyDict
 
-from .const import MSG_OFF, MSG_SEPARATOR, OPTIONS_NAME, TOPIC_PREFIX, TopicSuffix
+from .codec import MsgCodec, MsgDecoder, MsgEncoder
+from .const import (
+    OPTIONS_NAME,
+    PUBLISH_WINDOW,
+    TOPIC_CACHE_SIZE,
+    TOPIC_PREFIX,
+    TopicSuffix,
+)
+from .utils import LruCache
 
 _LOGGING = logging.getLogger(__name__)
 
 
+def _generate_topic(key: tuple[str, TopicSuffix]) -> str:
+    (entity_id, suffix) = key
+    # Bemfa topic supports alphanumeric only, md5 generates unique alphanumeric string of each entity id regardless of its format.
+    return TOPIC_PREFIX + hashlib.md5(entity_id.encode("utf-8")).hexdigest() + suffix
+
+
+# topics shared by syncs created again and again in options flow
+_TOPIC_CACHE: LruCache[tuple[str, TopicSuffix], str] = LruCache(TOPIC_CACHE_SIZE)
+
+
+def generate_topics(entity_id: str) -> list[str]:
+    """Topics an entity may sync to, one for each type of bemfa device."""
+    return [
+        _TOPIC_CACHE.get((entity_id, suffix), _generate_topic) for suffix in TopicSuffix
+    ]
+
+
+def forget_topics(entity_id: str) -> None:
+    """Drop cached topics of an entity, called when it is removed or renamed."""
+    for suffix in TopicSuffix:
+        _TOPIC_CACHE.pop((entity_id, suffix))
+
+
 class Sync(ABC):
     """An abstract class for bemfa syncs."""
 
@@ -37,6 +68,12 @@ class Sync(ABC):
         """Collect all supported bemfa syncs from hass."""
         raise NotImplementedError
 
+    @classmethod
+    @abstractmethod
+    def get_sync(cls, hass: HomeAssistant, entity_id: str) -> Sync | None:
+        """Get bemfa sync of a hass entity, None if it is not supported any more."""
+        raise NotImplementedError
+
     def __init__(
         self,
         hass: HomeAssistant,
@@ -49,6 +86,7 @@ class Sync(ABC):
         self._name = name
         self._topic = None
         self._config = {}
+        self._reset_cache()
 
     @property
     def entity_id(self) -> str:
@@ -72,6 +110,12 @@ class Sync(ABC):
     @config.setter
     def config(self, config: dict[str, str]):
         self._config = config
+        self._reset_cache()
+
+    def _reset_cache(self) -> None:
+        """Drop anything cached from config and states."""
+        # entity state and msg parts last encoded from it, None if stale
+        self._encoded: tuple[State, tuple[str, ...]] | None = None
 
     @property
     def topic(self) -> str:
@@ -80,14 +124,33 @@ class Sync(ABC):
         Each device corresponds to a particular topic whose suffix is a 3 digit number to indicate its type.
         """
         if self._topic is None:
-            # Bemfa topic supports alphanumeric only, md5 generates unique alphanumeric string of each entity id regardless of its format.
-            self._topic = (
-                TOPIC_PREFIX
-                + hashlib.md5(self._entity_id.encode("utf-8")).hexdigest()
-                + self._get_topic_suffix()
+            self._topic = _TOPIC_CACHE.get(
+                (self._entity_id, self._get_topic_suffix()), _generate_topic
             )
         return self._topic
 
+    @property
+    def publish_window(self) -> float:
+        """State changes within this window (seconds) are coalesced into one publish."""
+        return PUBLISH_WINDOW.get(self._get_topic_suffix(), 0)
+
+    @property
+    def min_publish_interval(self) -> float:
+        """Publish state msg once in this interval (seconds) at most."""
+        return 0
+
+    @property
+    def max_publish_interval(self) -> float:
+        """Publish state msg again after this interval (seconds) as a heartbeat, 0 to disable."""
+        return 0
+
+    def has_significant_change(self) -> bool:
+        """Whether states changed enough to publish since last msg published."""
+        return True
+
+    def msg_published(self) -> None:
+        """Called when the msg just generated is going to be published."""
+
     def generate_option_label(self) -> str:
         """Generate label in front end options list as "[domain]name"."""
         domain = self._entity_id.split(".")[0]
@@ -102,18 +165,16 @@ class Sync(ABC):
         """When state of one of these entites changed, send mqtt msg to bemfa servcie."""
         raise NotImplementedError
 
+    def state_changed(self, entity_id: str, new_state: State | None) -> None:
+        """Called when state of a watched entity changed."""
+        self._encoded = None
+
     def generate_msg(self) -> str:
         """Generate mqtt msg to send to bemfa service."""
-        parts = self._generate_msg_parts()
-
-        # remove useless tail parts
-        while len(parts) > 0 and parts[len(parts) - 1] == "":
-            parts.pop()
-
-        return MSG_SEPARATOR.join(parts)
+        return MsgCodec.join(self._generate_msg_parts())
 
     @abstractmethod
-    def _generate_msg_parts(self) -> list[str]:
+    def _generate_msg_parts(self) -> Sequence[str]:
         raise NotImplementedError
 
 
@@ -136,76 +197,82 @@ class ControllableSync(Sync):
             for state in hass.states.async_all(cls._supported_domain())
         ]
 
+    @classmethod
+    def get_sync(cls, hass: HomeAssistant, entity_id: str) -> Sync | None:
+        domains = cls._supported_domain()
+        if isinstance(domains, str):
+            domains = [domains]
+        state = hass.states.get(entity_id)
+        if state is None or state.domain not in domains:
+            return None
+        return cls(hass, state.entity_id, state.name)
+
     def get_watched_entity_ids(self) -> list[str]:
         return [self._entity_id]
 
-    def _generate_msg_parts(self) -> list[str]:
+    @classmethod
+    def _codec(cls) -> MsgCodec:
+        """Codec of this sync type, compiled from its generators and resolvers once."""
+        codec = cls.__dict__.get("_compiled_codec")
+        if codec is None:
+            codec = MsgCodec(cls._msg_generators(), cls._msg_resolvers())
+            cls._compiled_codec = codec
+        return codec
+
+    def _generate_msg_parts(self) -> tuple[str, ...]:
         state = self._hass.states.get(self._entity_id)
         if state is None:
-            return []
-
-        generators = self._msg_generators()
-        msg = [generators[0](state.state, state.attributes)]
-
-        # if first one is off, the following parts is useless
-        if msg[0] != MSG_OFF:
-            msg += list(
-                map(
-                    lambda f: str(f(state.state, state.attributes)),
-                    generators[1:],
-                )
-            )
-        return msg
+            self._encoded = None
+            return ()
+        parts = self._codec().encode(self, state)
+        self._encoded = (state, parts)
+        return parts
 
+    @classmethod
     @abstractmethod
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
+    def _msg_generators(cls) -> list[MsgEncoder]:
         raise NotImplementedError
 
-    def resolve_msg(self, msg: str):
+    async def async_resolve_msg(self, msg: str):
         """Resolve mqtt msg received from bemfa service."""
-        state = self._hass.states.get(self._entity_id)
-        if state is None:
+        # msg parts last published to compare to received msg, generate them if stale
+        if self._encoded is None:
+            self._generate_msg_parts()
+            if self._encoded is None:
+                return
+        (state, state_parts) = self._encoded
+
+        codec = self._codec()
+        calls = codec.resolve(
+            self,
+            codec.decode(msg),
+            state_parts,
+            state.attributes,
+            self._resolve_all_fields(),
+        )
+        if not calls:
             return
 
-        msg_list: list[str] = msg.split(MSG_SEPARATOR)
-        if msg_list[0] == MSG_OFF:
-            msg_list = [MSG_OFF]  # discard any data followed by "off"
+        for call in calls:
+            call[2].update({ATTR_ENTITY_ID: self._entity_id})
 
-        # generate msg from entity to compare to received msg
-        state_msg_list = MSG_SEPARATOR.join(self._generate_msg_parts()).split(
-            MSG_SEPARATOR
+        # service call of the first field goes first, eg. turn on before setting others
+        await self._hass.services.async_call(*calls[0], blocking=True)
+        await asyncio.gather(
+            *[
+                self._hass.services.async_call(*call, blocking=True)
+                for call in calls[1:]
+            ]
         )
 
-        for resolver in self._msg_resolvers():
-            start_index = resolver[0]
-            end_index = min(resolver[1], len(msg_list), len(state_msg_list))
-            if msg_list[start_index:end_index] != state_msg_list[start_index:end_index]:
-                (domain, service, data) = resolver[2](
-                    [
-                        int(msg) if msg.isdigit() else msg
-                        for msg in msg_list[start_index:end_index]
-                    ],
-                    state.attributes,
-                )
-                data.update({ATTR_ENTITY_ID: self._entity_id})
-                self._hass.services.call(
-                    domain=domain, service=service, service_data=data
-                )
-                break  # call only one service at most on each msg received
+    @staticmethod
+    def _resolve_all_fields() -> bool:
+        """Whether to apply all changed fields of a msg at once,
+        otherwise call one service at most and let bemfa service send the rest again.
+        """
+        return False
 
+    @classmethod
     @abstractmethod
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         raise NotImplementedError
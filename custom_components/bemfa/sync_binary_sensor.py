@@ -1,5 +1,5 @@
 """Support for bemfa service."""
-
+from __future__ import annotations
 
 from homeassistant.const import STATE_ON
 from homeassistant.core import HomeAssistant
@@ -27,6 +27,13 @@ class BinarySensor(Sync):
             for state in hass.states.async_all(DOMAIN)
         ]
 
+    @classmethod
+    def get_sync(cls, hass: HomeAssistant, entity_id: str) -> Sync | None:
+        state = hass.states.get(entity_id)
+        if state is None or state.domain != DOMAIN:
+            return None
+        return cls(hass, state.entity_id, state.name)
+
     def get_watched_entity_ids(self) -> list[str]:
         return [self._entity_id]
 
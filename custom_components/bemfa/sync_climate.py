@@ -3,7 +3,6 @@ from __future__ import annotations
 from typing import Any, Final
 
 import logging
-from collections.abc import Mapping, Callable
 import voluptuous as vol
 
 from homeassistant.components.climate import (
@@ -38,7 +37,6 @@ from homeassistant.helpers.selector import (
     SelectSelectorConfig,
     SelectSelectorMode,
 )
-from homeassistant.util.read_only_dict import ReadOnlyDict
 from .const import (
     MSG_OFF,
     MSG_ON,
@@ -56,6 +54,7 @@ from .const import (
     TopicSuffix,
 )
 from .utils import has_key
+from .codec import MsgDecoder, MsgEncoder
 from .sync import SYNC_TYPES, ControllableSync
 
 _LOGGING = logging.getLogger(__name__)
@@ -138,6 +137,10 @@ class Climate(ControllableSync):
     def _supported_domain() -> str:
         return DOMAIN
 
+    @staticmethod
+    def _resolve_all_fields() -> bool:
+        return True
+
     def generate_details_schema(self) -> dict[str, Any]:
         schema = super().generate_details_schema()
         state = self._hass.states.get(self._entity_id)
@@ -169,55 +172,54 @@ class Climate(ControllableSync):
                             ] = selector
         return schema
 
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
+    @classmethod
+    def _msg_generators(cls) -> list[MsgEncoder]:
         return [
-            lambda state, attributes: MSG_OFF if state == HVACMode.OFF else MSG_ON,
-            lambda state, attributes: SUPPORTED_HVAC_MODES.index(state) + 1
+            lambda sync, state, attributes: MSG_OFF
+            if state == HVACMode.OFF
+            else MSG_ON,
+            lambda sync, state, attributes: SUPPORTED_HVAC_MODES.index(state) + 1
             if state in SUPPORTED_HVAC_MODES
             else "",
-            lambda state, attributes: round(attributes[ATTR_TEMPERATURE])
+            lambda sync, state, attributes: round(attributes[ATTR_TEMPERATURE])
             if has_key(attributes, ATTR_TEMPERATURE)
             else "",
-            lambda state, attributes: _get_detail_value(
-                attributes, self._config, DETAILS_CFG[0]
-            ),
-            lambda state, attributes: _get_detail_value(
-                attributes, self._config, DETAILS_CFG[1]
+            lambda sync, state, attributes: _get_detail_value(
+                attributes, sync.config, DETAILS_CFG[0]
             ),
+            # swing value holds 2 parts: horizontal and vertical
+            lambda sync, state, attributes: _get_detail_value(
+                attributes, sync.config, DETAILS_CFG[1]
+            ).split(MSG_SEPARATOR)[0],
+            lambda sync, state, attributes: _get_detail_value(
+                attributes, sync.config, DETAILS_CFG[1]
+            ).split(MSG_SEPARATOR)[1],
         ]
 
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 0,
                 2,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_HVAC_MODE,
                     {ATTR_HVAC_MODE: SUPPORTED_HVAC_MODES[msg[1] - 1]},
                 )
-                if len(msg) > 1 and msg[1] >= 1 and msg[1] <= 5
+                if len(msg) > 1
+                and isinstance(msg[1], int)
+                and msg[1] >= 1
+                and msg[1] <= 5
+                # modes we do not map, eg. sleep or energy saving, turn it on only
                 else (DOMAIN, SERVICE_TURN_ON, {})
-                if msg[0] == MSG_ON and len(msg) == 1
+                if msg[0] == MSG_ON
                 else (DOMAIN, SERVICE_TURN_OFF, {}),
             ),
             (
                 2,
                 3,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_TEMPERATURE,
                     {ATTR_TEMPERATURE: msg[0]},
@@ -226,11 +228,11 @@ class Climate(ControllableSync):
             (
                 3,
                 4,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_FAN_MODE,
                     {
-                        ATTR_FAN_MODE: self._config[
+                        ATTR_FAN_MODE: sync.config[
                             DETAILS_CFG[0][CFG_KEYS][
                                 DETAILS_CFG[0][CFG_VALUES].index(msg[0])
                             ]
@@ -241,11 +243,11 @@ class Climate(ControllableSync):
             (
                 4,
                 6,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_SWING_MODE,
                     {
-                        ATTR_SWING_MODE: self._config[
+                        ATTR_SWING_MODE: sync.config[
                             DETAILS_CFG[1][CFG_KEYS][
                                 DETAILS_CFG[1][CFG_VALUES].index(
                                     MSG_SEPARATOR.join(map(str, msg))
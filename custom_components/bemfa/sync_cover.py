@@ -1,8 +1,6 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
-from collections.abc import Mapping, Callable
-from typing import Any
 from homeassistant.components.cover import ATTR_CURRENT_POSITION, ATTR_POSITION, DOMAIN
 
 from homeassistant.const import (
@@ -11,9 +9,9 @@ from homeassistant.const import (
     SERVICE_SET_COVER_POSITION,
     SERVICE_STOP_COVER,
 )
-from homeassistant.util.read_only_dict import ReadOnlyDict
 from .const import MSG_OFF, MSG_ON, TopicSuffix
 from .utils import has_key
+from .codec import MsgDecoder, MsgEncoder
 from .sync import SYNC_TYPES, ControllableSync
 
 
@@ -33,38 +31,27 @@ class Cover(ControllableSync):
     def _supported_domain() -> str:
         return DOMAIN
 
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
+    @classmethod
+    def _msg_generators(cls) -> list[MsgEncoder]:
         return [
-            lambda state, attributes: MSG_OFF
+            lambda sync, state, attributes: MSG_OFF
             if has_key(attributes, ATTR_CURRENT_POSITION)
             and attributes[ATTR_CURRENT_POSITION] == 0
             or not has_key(attributes, ATTR_CURRENT_POSITION)
             and state == "closed"
             else MSG_ON,
-            lambda state, attributes: attributes[ATTR_CURRENT_POSITION]
+            lambda sync, state, attributes: attributes[ATTR_CURRENT_POSITION]
             if has_key(attributes, ATTR_CURRENT_POSITION)
             else "",
         ]
 
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 0,
                 2,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_COVER_POSITION,
                     {ATTR_POSITION: msg[1]},
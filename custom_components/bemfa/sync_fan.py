@@ -1,8 +1,6 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
-from collections.abc import Mapping, Callable
-from typing import Any
 from homeassistant.components.fan import (
     ATTR_OSCILLATING,
     ATTR_PERCENTAGE,
@@ -12,9 +10,9 @@ from homeassistant.components.fan import (
     SERVICE_SET_PERCENTAGE,
 )
 from homeassistant.const import SERVICE_TURN_OFF, SERVICE_TURN_ON, STATE_ON
-from homeassistant.util.read_only_dict import ReadOnlyDict
 from .const import MSG_OFF, MSG_ON, TopicSuffix
 from .utils import has_key
+from .codec import MsgDecoder, MsgEncoder
 from .sync import SYNC_TYPES, ControllableSync
 
 
@@ -34,41 +32,34 @@ class Fan(ControllableSync):
     def _supported_domain() -> str:
         return DOMAIN
 
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
+    @staticmethod
+    def _resolve_all_fields() -> bool:
+        return True
+
+    @classmethod
+    def _msg_generators(cls) -> list[MsgEncoder]:
         return [
-            lambda state, attributes: MSG_ON if state == STATE_ON else MSG_OFF,
-            lambda state, attributes: min(
+            lambda sync, state, attributes: MSG_ON if state == STATE_ON else MSG_OFF,
+            lambda sync, state, attributes: min(
                 round(attributes[ATTR_PERCENTAGE] / attributes[ATTR_PERCENTAGE_STEP]), 4
             )
             if has_key(attributes, ATTR_PERCENTAGE)
             and has_key(attributes, ATTR_PERCENTAGE_STEP)
             else "",
-            lambda state, attributes: 1
+            lambda sync, state, attributes: 1
             if has_key(attributes, ATTR_OSCILLATING) and attributes[ATTR_OSCILLATING]
             else 0
             if has_key(attributes, ATTR_OSCILLATING)
             else "",
         ]
 
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 0,
                 2,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_SET_PERCENTAGE,
                     {
@@ -87,10 +78,13 @@ class Fan(ControllableSync):
             (
                 2,
                 3,
-                lambda msg, attributes: (
+                # fans not supporting oscillation have no such attribute even if off
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_OSCILLATE,
                     {ATTR_OSCILLATING: msg[0] == 1},
-                ),
+                )
+                if ATTR_OSCILLATING in attributes
+                else None,
             ),
         ]
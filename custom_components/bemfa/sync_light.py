@@ -1,8 +1,6 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
-from collections.abc import Mapping, Callable
-from typing import Any
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
     ATTR_BRIGHTNESS_PCT,
@@ -15,9 +13,9 @@ from homeassistant.components.light import (
     ColorMode,
 )
 from homeassistant.const import SERVICE_TURN_OFF, SERVICE_TURN_ON, STATE_ON
-from homeassistant.util.read_only_dict import ReadOnlyDict
 from .const import MSG_OFF, MSG_ON, TopicSuffix
 from .utils import has_key
+from .codec import MsgDecoder, MsgEncoder
 from .sync import SYNC_TYPES, ControllableSync
 
 
@@ -37,15 +35,14 @@ class Light(ControllableSync):
     def _supported_domain() -> str:
         return DOMAIN
 
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
+    @classmethod
+    def _msg_generators(cls) -> list[MsgEncoder]:
         return [
-            lambda state, attributes: MSG_ON if state == STATE_ON else MSG_OFF,
-            lambda state, attributes: round(attributes[ATTR_BRIGHTNESS] / 2.55)
+            lambda sync, state, attributes: MSG_ON if state == STATE_ON else MSG_OFF,
+            lambda sync, state, attributes: round(attributes[ATTR_BRIGHTNESS] / 2.55)
             if has_key(attributes, ATTR_BRIGHTNESS)
             else "",
-            lambda state, attributes: 1000000 // attributes[ATTR_COLOR_TEMP]
+            lambda sync, state, attributes: 1000000 // attributes[ATTR_COLOR_TEMP]
             if has_key(attributes, ATTR_COLOR_TEMP)
             else attributes[ATTR_RGB_COLOR][0] * 256 * 256
             + attributes[ATTR_RGB_COLOR][1] * 256
@@ -54,23 +51,13 @@ class Light(ControllableSync):
             else "",
         ]
 
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 0,
                 3,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     DOMAIN,
                     SERVICE_TURN_ON if msg[0] == MSG_ON else SERVICE_TURN_OFF,
                     {
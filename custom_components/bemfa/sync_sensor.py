@@ -1,4 +1,5 @@
 """Support for bemfa service."""
+from __future__ import annotations
 
 import logging
 from typing import Any
@@ -6,9 +7,12 @@ import voluptuous as vol
 
 from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN, SensorDeviceClass
 from homeassistant.const import ATTR_DEVICE_CLASS
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, State
 from homeassistant.helpers import area_registry
 from homeassistant.helpers.selector import (
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
     SelectOptionDict,
     SelectSelector,
     SelectSelectorConfig,
@@ -18,16 +22,41 @@ from homeassistant.helpers.template import area_entities
 from .utils import has_key
 from .const import (
     OPTIONS_CO2,
+    OPTIONS_CO2_DEADBAND,
     OPTIONS_HUMIDITY,
+    OPTIONS_HUMIDITY_DEADBAND,
     OPTIONS_ILLUMINANCE,
+    OPTIONS_ILLUMINANCE_DEADBAND,
+    OPTIONS_MAX_INTERVAL,
+    OPTIONS_MIN_INTERVAL,
     OPTIONS_PM25,
+    OPTIONS_PM25_DEADBAND,
     OPTIONS_TEMPERATURE,
+    OPTIONS_TEMPERATURE_DEADBAND,
     TopicSuffix,
 )
 from .sync import SYNC_TYPES, Sync
 
 _LOGGING = logging.getLogger(__name__)
 
+# fields of bemfa sensor msg in order
+SENSOR_FIELDS = (
+    OPTIONS_TEMPERATURE,
+    OPTIONS_HUMIDITY,
+    OPTIONS_ILLUMINANCE,
+    OPTIONS_PM25,
+    OPTIONS_CO2,
+)
+
+# publish a field only if its value moves beyond the deadband
+SENSOR_DEADBANDS = (
+    OPTIONS_TEMPERATURE_DEADBAND,
+    OPTIONS_HUMIDITY_DEADBAND,
+    OPTIONS_ILLUMINANCE_DEADBAND,
+    OPTIONS_PM25_DEADBAND,
+    OPTIONS_CO2_DEADBAND,
+)
+
 
 @SYNC_TYPES.register("sensor")
 class Sensor(Sync):
@@ -49,6 +78,13 @@ class Sensor(Sync):
             for area in area_registry.async_get(hass).async_list_areas()
         ]
 
+    @classmethod
+    def get_sync(cls, hass: HomeAssistant, entity_id: str) -> Sync | None:
+        area = area_registry.async_get(hass).async_get_area(entity_id.split(".")[1])
+        if area is None:
+            return None
+        return cls(hass, "area.{id}".format(id=area.id), area.name)
+
     def generate_details_schema(self) -> dict[str, Any]:
         temperature_sensors: dict[str, str] = {}
         humidity_sensors: dict[str, str] = {}
@@ -106,33 +142,95 @@ class Sensor(Sync):
                         mode=SelectSelectorMode.DROPDOWN,
                     )
                 )
+                _k = SENSOR_DEADBANDS[SENSOR_FIELDS.index(_t)]
+                schema[
+                    vol.Optional(
+                        _k, description={"suggested_value": self._config.get(_k, 0)}
+                    )
+                ] = NumberSelector(
+                    NumberSelectorConfig(
+                        min=0, max=1000, step=0.1, mode=NumberSelectorMode.BOX
+                    )
+                )
+        for _k in (OPTIONS_MIN_INTERVAL, OPTIONS_MAX_INTERVAL):
+            schema[
+                vol.Optional(
+                    _k, description={"suggested_value": self._config.get(_k, 0)}
+                )
+            ] = NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=86400,
+                    step=1,
+                    unit_of_measurement="s",
+                    mode=NumberSelectorMode.BOX,
+                )
+            )
         return schema
 
+    @property
+    def min_publish_interval(self) -> float:
+        return self._config.get(OPTIONS_MIN_INTERVAL, 0)
+
+    @property
+    def max_publish_interval(self) -> float:
+        return self._config.get(OPTIONS_MAX_INTERVAL, 0)
+
     def get_watched_entity_ids(self) -> list[str]:
-        ids: list[str] = []
-        for name in (
-            OPTIONS_TEMPERATURE,
-            OPTIONS_HUMIDITY,
-            OPTIONS_ILLUMINANCE,
-            OPTIONS_PM25,
-            OPTIONS_CO2,
-        ):
-            if name in self._config:
-                ids.append(self._config[name])
-        return ids
+        return [self._config[name] for name in SENSOR_FIELDS if name in self._config]
+
+    def _reset_cache(self) -> None:
+        super()._reset_cache()
+        # state of each field, None if not configured or unavailable
+        self._field_values: list[str | None] | None = None
+        # entity_id -> indexes of fields it configured as
+        self._entity_to_fields: dict[str, list[int]] = {}
+        # field values of last msg published
+        self._published_values: list[str | None] | None = None
+
+    def _get_field_values(self) -> list[str | None]:
+        if self._field_values is None:
+            self._field_values = []
+            self._entity_to_fields = {}
+            for (index, name) in enumerate(SENSOR_FIELDS):
+                state = None
+                if name in self._config:
+                    self._entity_to_fields.setdefault(self._config[name], []).append(
+                        index
+                    )
+                    state = self._hass.states.get(self._config[name])
+                self._field_values.append(None if state is None else state.state)
+        return self._field_values
+
+    def state_changed(self, entity_id: str, new_state: State | None) -> None:
+        if self._field_values is None:
+            return
+        for index in self._entity_to_fields.get(entity_id, ()):
+            self._field_values[index] = None if new_state is None else new_state.state
 
     def _generate_msg_parts(self) -> list[str]:
         msg: list[str] = [""]
-        for name in (
-            OPTIONS_TEMPERATURE,
-            OPTIONS_HUMIDITY,
-            "",
-            OPTIONS_ILLUMINANCE,
-            OPTIONS_PM25,
-            OPTIONS_CO2,
-        ):
-            if name in self._config:
-                state = self._hass.states.get(self._config[name])
-                if state is not None:
-                    msg.append(state.state)
+        for value in self._get_field_values():
+            if value is not None:
+                msg.append(value)
         return msg
+
+    def has_significant_change(self) -> bool:
+        if self._published_values is None:
+            return True
+        for (index, value) in enumerate(self._get_field_values()):
+            published = self._published_values[index]
+            if value == published:
+                continue
+            try:
+                if abs(float(value) - float(published)) <= self._config.get(
+                    SENSOR_DEADBANDS[index], 0
+                ):
+                    continue
+            except (TypeError, ValueError):
+                pass  # appeared, disappeared or not a number
+            return True
+        return False
+
+    def msg_published(self) -> None:
+        self._published_values = list(self._get_field_values())
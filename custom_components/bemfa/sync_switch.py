@@ -1,8 +1,6 @@
 """Support for bemfa service."""
 from __future__ import annotations
 
-from collections.abc import Mapping, Callable
-from typing import Any
 from homeassistant.components.automation import DOMAIN as AUTOMATION_DOMAIN
 from homeassistant.components.camera import DOMAIN as CAMERA_DOMAIN, STATE_IDLE
 from homeassistant.components.group import DOMAIN as GROUP_DOMAIN
@@ -34,8 +32,8 @@ from homeassistant.const import (
     STATE_PLAYING,
 )
 from homeassistant.core import DOMAIN as HOMEASSISTANT_DOMAIN
-from homeassistant.util.read_only_dict import ReadOnlyDict
 from .const import MSG_OFF, MSG_ON, TopicSuffix
+from .codec import MsgDecoder, MsgEncoder
 from .sync import SYNC_TYPES, ControllableSync
 
 
@@ -63,42 +61,30 @@ class Switch(ControllableSync):
             SIREN_DOMAIN,
         ]
 
-    def _msg_generators(
-        self,
-    ) -> list[Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]]:
-        return [self._msg_generator()]
-
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_generators(cls) -> list[MsgEncoder]:
+        return [cls._msg_generator()]
+
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 # split bemfa msg by "#", then take a sub list
                 0,  # from this index
                 1,  # to this index
-                lambda msg, attributes: (  # and pass to this fun as param "msg"
-                    self._service_domain(),
-                    self._service_names()[0]
+                lambda sync, msg, attributes: (  # and pass to this fun as param "msg"
+                    sync._service_domain(),
+                    sync._service_names()[0]
                     if msg[0] == MSG_ON
-                    else self._service_names()[1],
+                    else sync._service_names()[1],
                     {},
                 ),
             )
         ]
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
-        return lambda state, attributes: MSG_ON if state == STATE_ON else MSG_OFF
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
+        return lambda sync, state, attributes: MSG_ON if state == STATE_ON else MSG_OFF
 
     def _service_domain(self) -> str:
         """Domain of service calls."""
@@ -117,10 +103,11 @@ class Camera(Switch):
     def _supported_domain() -> str:
         return CAMERA_DOMAIN
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
-        return lambda state, attributes: MSG_OFF if state == STATE_IDLE else MSG_ON
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
+        return (
+            lambda sync, state, attributes: MSG_OFF if state == STATE_IDLE else MSG_ON
+        )
 
 
 @SYNC_TYPES.register("media_player")
@@ -131,10 +118,13 @@ class MediaPlayer(Switch):
     def _supported_domain() -> str:
         return MEDIA_PLAYER_DOMAIN
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
-        return lambda state, attributes: MSG_ON if state == STATE_PLAYING else MSG_OFF
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
+        return (
+            lambda sync, state, attributes: MSG_ON
+            if state == STATE_PLAYING
+            else MSG_OFF
+        )
 
 
 @SYNC_TYPES.register("lock")
@@ -145,10 +135,11 @@ class Lock(Switch):
     def _supported_domain() -> str:
         return LOCK_DOMAIN
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
-        return lambda state, attributes: MSG_OFF if state == STATE_LOCKED else MSG_ON
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
+        return (
+            lambda sync, state, attributes: MSG_OFF if state == STATE_LOCKED else MSG_ON
+        )
 
     def _service_names(self) -> tuple[str, str]:
         return (SERVICE_UNLOCK, SERVICE_LOCK)
@@ -162,10 +153,9 @@ class Scene(Switch):
     def _supported_domain() -> str:
         return SCENE_DOMAIN
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
-        return lambda state, attributes: MSG_OFF
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
+        return lambda sync, state, attributes: MSG_OFF
 
 
 @SYNC_TYPES.register("group")
@@ -188,32 +178,21 @@ class Vacuum(Switch):
     def _supported_domain() -> str:
         return VACUUM_DOMAIN
 
-    def _msg_generator(
-        self,
-    ) -> Callable[[str, ReadOnlyDict[Mapping[str, Any]]], str | int]:
+    @staticmethod
+    def _msg_generator() -> MsgEncoder:
         return (
-            lambda state, attributes: MSG_ON
+            lambda sync, state, attributes: MSG_ON
             if state in [STATE_ON, STATE_CLEANING]
             else MSG_OFF
         )
 
-    def _msg_resolvers(
-        self,
-    ) -> list[
-        (
-            int,
-            int,
-            Callable[
-                [list[str | int], ReadOnlyDict[Mapping[str, Any]]],
-                (str, str, dict[str, Any]),
-            ],
-        )
-    ]:
+    @classmethod
+    def _msg_resolvers(cls) -> list[MsgDecoder]:
         return [
             (
                 0,
                 1,
-                lambda msg, attributes: (
+                lambda sync, msg, attributes: (
                     VACUUM_DOMAIN,
                     SERVICE_START
                     if msg[0] == MSG_ON
@@ -1,11 +1,70 @@
 """Support for bemfa service."""
 
 import logging
-from typing import Any
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Generic, TypeVar
 
 _LOGGING = logging.getLogger(__name__)
 
+_KT = TypeVar("_KT", bound=Hashable)
+_VT = TypeVar("_VT")
+
 
 def has_key(data: Any, key: str) -> bool:
     """Whether data has specific valid key."""
     return key in data and data[key] is not None
+
+
+class TokenBucket:
+    """Token bucket to limit rate of actions."""
+
+    def __init__(self, size: float, rate: float, now: float) -> None:
+        """Initialize a full bucket, refilled by rate tokens per second."""
+        self._size = size
+        self._rate = rate
+        self._tokens = size
+        self._updated_at = now
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self._size, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+    def consume(self, now: float) -> bool:
+        """Take a token if there is one."""
+        self._refill(now)
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def wait_time(self, now: float) -> float:
+        """Seconds to wait for next token."""
+        self._refill(now)
+        return max(0, (1 - self._tokens) / self._rate)
+
+
+class LruCache(Generic[_KT, _VT]):
+    """Bounded cache dropping the least recently used item when full."""
+
+    def __init__(self, size: int) -> None:
+        """Initialize."""
+        self._size = size
+        self._data: OrderedDict[_KT, _VT] = OrderedDict()
+
+    def get(self, key: _KT, factory: Callable[[_KT], _VT]) -> _VT:
+        """Get value of key, produced by factory if not cached."""
+        if key in self._data:
+            self._data.move_to_end(key)
+            return self._data[key]
+        value = factory(key)
+        self._data[key] = value
+        if len(self._data) > self._size:
+            self._data.popitem(last=False)
+        return value
+
+    def pop(self, key: _KT) -> None:
+        """Drop value of key."""
+        self._data.pop(key, None)